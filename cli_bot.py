@@ -1,33 +1,156 @@
 import json
+import os
+import re
+import sys
 from functools import wraps
 from pathlib import Path
 from typing import List, Dict
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, the stdlib json is used without it
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # ijson is optional, without it the file is parsed at once
+    ijson = None
+
 from cli_bot_classes import AddressBook, Record
 from normalize_phone import normalize_phone
 
 PHONEBOOK_FILE = "phonebook.json"
+JOURNAL_SUFFIX = ".journal"
+
+_split_command = re.compile(r"\S+").findall  # splits the input without a separate strip()
+_EXITS = frozenset({"close", "exit"})
+
+
+def _journal_path(path: Path) -> Path:
+    return path.with_name(path.name + JOURNAL_SUFFIX)
+
+
+def _json_dumps(obj, indent=False) -> bytes:
+    """Serialize the object to JSON bytes with orjson if it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=4 if indent else None).encode()
+
+
+def _json_loads(data):
+    """Deserialize JSON bytes or str with orjson if it is installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    """Write the data to a temporary file and move it over the path, so readers never see a partial file."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+def _iter_contacts(path: Path):
+    """Yield the contacts stored in the JSON file.
+
+    With ijson the file is parsed one contact at a time, so the whole list is never held in memory.
+    """
+    if ijson is not None:
+        with open(path, "rb") as file:
+            yield from ijson.items(file, "item")
+    else:
+        yield from _json_loads(path.read_bytes())
+
+
+def journal_change(phonebook: AddressBook, entry: dict) -> None:
+    """Append a single change of the phonebook to its journal file.
+
+    An entry holds the whole state of the changed record, so replaying it again over a
+    snapshot which already contains the change gives the same result. If the journal
+    cannot be written, a warning is printed and journaling is turned off for the session.
+
+    __args__:
+        phonebook: AddressBook object
+        entry: dict
+            The change, {"op": "set", **record.to_dict()} or {"op": "delete", "name": ...}
+    __return__:
+        None
+    """
+    if phonebook.journal is None:  # the phonebook was not loaded from a file
+        return
+    try:
+        with open(phonebook.journal, "ab") as file:
+            file.write(_json_dumps(entry) + b"\n")
+    except OSError as e:
+        print(f"[WARNING] Changes are not journaled, save them on exit: {e}")
+        phonebook.journal = None
+
+
+def _apply_change(phonebook: AddressBook, line: bytes) -> None:
+    entry = _json_loads(line)
+    if not isinstance(entry, dict):
+        raise ValueError("not a journal entry")
+    if entry["op"] == "delete":
+        phonebook.delete_record(entry["name"])
+    elif entry["op"] == "set":
+        phonebook.add_record(Record(entry["name"], entry["phones"], entry["birthday"]))
+    else:
+        raise ValueError(f"unknown operation {entry['op']!r}")
+
+
+def _replay_journal(phonebook: AddressBook, journal: Path) -> None:
+    """Apply the changes from the journal on top of the loaded snapshot.
+
+    Only the last line may be broken, which happens when the bot dies while writing it.
+    A broken line anywhere else means the journal is corrupt and raises ValueError.
+    """
+    try:
+        lines = journal.read_bytes().splitlines()
+    except FileNotFoundError:
+        return
+    for number, line in enumerate(lines, 1):
+        try:
+            _apply_change(phonebook, line)
+        except (ValueError, KeyError, TypeError) as e:
+            if number == len(lines):
+                break  # a torn last line after a crash
+            raise ValueError(f"Corrupt journal {journal}, line {number}: {e!r}") from e
 
 
 def load_phonebook(filename=PHONEBOOK_FILE) -> AddressBook:
     """Function to load the phonebook from the file.
 
+    Changes made after the last save are replayed from the journal file.
+
     __args__:
         Filename: str
     __return__:
         AddressBook object
     """
     path = Path(filename)
+    phonebook = _load_snapshot(path)
+    phonebook.journal = _journal_path(path)
+    _replay_journal(phonebook, phonebook.journal)
+    return phonebook
+
+
+def _load_snapshot(path: Path) -> AddressBook:
+    phonebook = AddressBook()
     try:
-        with open(path, "r") as file:
-            return AddressBook(json.load(file))
+        for contact in _iter_contacts(path):
+            phonebook.add_record(Record(contact["name"], contact.get("phones"), contact.get("birthday")))
     except FileNotFoundError:
-        return AddressBook()
+        pass
+    return phonebook
 
 
 def save_phonebook(phonebook: AddressBook, filename=PHONEBOOK_FILE) -> None:
     """Function to save the phonebook to the file.
 
+    The JSON file is replaced atomically, after which the journal is no longer needed
+    and is removed.
+
     __args__:
         phonebook: AddressBook object
         filename: str
@@ -36,8 +159,8 @@ def save_phonebook(phonebook: AddressBook, filename=PHONEBOOK_FILE) -> None:
         None
     """
     path = Path(filename)
-    with open(path, "w") as file:
-        json.dump(phonebook, file, indent=4)
+    _write_atomic(path, _json_dumps([record.to_dict() for record in phonebook.values()], indent=True))
+    _journal_path(path).unlink(missing_ok=True)
 
 
 def input_error(func):
@@ -90,9 +213,10 @@ def add_contact(
     if record:
         # add phone to existing record
         record.add_phone(phone)
+        phonebook.reindex(record)
         if birthday:
             record.add_birthday(birthday)
-        print(f"Phone number {phone} added to contact {name}")
+        message = f"Phone number {phone} added to contact {name}"
     else:
         # create new record
         record = Record(name)
@@ -100,7 +224,9 @@ def add_contact(
         if birthday:
             record.add_birthday(birthday)
         phonebook.add_record(record)
-        print(f"Contact {name} added with phone number {phone}")
+        message = f"Contact {name} added with phone number {phone}"
+    journal_change(phonebook, {"op": "set", **record.to_dict()})
+    print(message)
 
 
 @input_error
@@ -117,12 +243,15 @@ def change_contact(name: str, new_phone: str, phonebook: AddressBook) -> None:
     __return__:
         None
     """
-    record = phonebook.get(name)
+    record = phonebook.find(name)
     if not record:
-        raise ValueError(f"Contact {name} not found.")
+        print(f"Contact {name} not found.")
+        return
 
     new_phone = normalize_phone(new_phone)
     record.edit_phone(record.phones[0].value, new_phone)
+    phonebook.reindex(record)
+    journal_change(phonebook, {"op": "set", **record.to_dict()})
     print(f"Contact {name} updated.\nNew phone: {new_phone}")
 
 
@@ -138,9 +267,10 @@ def delete_contact(name: str, phonebook: AddressBook) -> None:
     __return__:
         None
     """
-    if not phonebook.find(name):
-        raise ValueError(f"Contact {name} not found.")
-    phonebook.delete_record(name)
+    if phonebook.delete_record(name) is None:  # a single lookup both checks and deletes
+        print(f"Contact {name} not found.")
+        return
+    journal_change(phonebook, {"op": "delete", "name": name})
     print(f"Contact {name} deleted.")
 
 
@@ -157,15 +287,14 @@ def search_contact(pattern: str, phonebook: AddressBook) -> None:
         None
     """
 
-    found = False
-
-    for name, record in phonebook.items():
-        if pattern.lower() in name.lower() or any(pattern.lower() in phone.value.lower() for phone in record.phones):
-            print(f"{name}: {'; '.join(phone.value for phone in record.phones)}")
-            found = True
-
+    found = phonebook.search(pattern)
     if not found:
-        raise ValueError(f"Contact {pattern} not found.")
+        print(f"Contact {pattern} not found.")
+        return
+
+    sys.stdout.write("".join(
+        f"{record.name.value}: {'; '.join(phone.value for phone in record.phones)}\n" for record in found
+    ))
 
 
 @input_error
@@ -180,11 +309,10 @@ def show_phonebook(phonebook: AddressBook, sorted_=True) -> None:
     __return__:
         None
     """
-    records = list(phonebook.values())
-    if sorted_:  # Sort the phonebook by name
-        records.sort(key=lambda x: x.name.value)
-    for contact in records:
-        print(contact)
+    # the phonebook keeps the names sorted, so no sort is needed here
+    records = list(phonebook.sorted_records() if sorted_ else phonebook.values())
+    if records:  # one write instead of a print call per contact
+        sys.stdout.write("\n".join(map(str, records)) + "\n")
 
 
 @input_error
@@ -203,9 +331,14 @@ def add_birthday(name: str, birthday: str, phonebook: AddressBook) -> None:
     """
     record = phonebook.find(name)
     if not record:
-        raise ValueError(f"Contact {name} not found.")
+        print(f"Contact {name} not found.")
+        return
 
+    old_birthday = record.birthday
     record.add_birthday(birthday)
+    if record.birthday is old_birthday:  # the date was rejected, add_birthday printed why
+        return
+    journal_change(phonebook, {"op": "set", **record.to_dict()})
     print(f"Birthday for contact {name} added: {birthday}")
 
 
@@ -223,7 +356,8 @@ def show_birthday(name: str, phonebook: AddressBook) -> None:
     """
     record = phonebook.find(name)
     if not record:
-        raise ValueError(f"Contact {name} not found.")
+        print(f"Contact {name} not found.")
+        return
 
     if record.birthday:
         print(f"Birthday for contact {name}: {record.birthday.value.strftime('%A, %B %d')}")
@@ -256,44 +390,56 @@ def main(phonebook=None):
     if phonebook is None:  # Load the phonebook if not provided
         phonebook = load_phonebook()
 
+    # command -> (handler, allowed numbers of arguments, usage)
     commands = {
-        "hello": lambda _: print("How can I help you?"),
-        "add": lambda args: add_contact(args[0], phonebook, phone=args[1]),
-        "change": lambda args: change_contact(args[0], args[1], phonebook),
-        "delete": lambda args: delete_contact(args[0], phonebook),
-        "search": lambda args: search_contact(args[0], phonebook),
-        "show": lambda args: show_phonebook(phonebook, sorted_=False),
-        "all": lambda args: show_phonebook(phonebook, sorted_=False),
-        "close": lambda _: print("Good bye!"),
-        "exit": lambda _: print("Good bye!"),
-        "phone": lambda args: search_contact(args[0], phonebook),
-        "add-birthday": lambda args: add_birthday(args[0], args[1], phonebook),
-        "show-birthday": lambda args: show_birthday(args[0], phonebook),
-        "birthdays": lambda _: birthdays(phonebook)
+        "hello": (lambda: print("How can I help you?"), (0,), "hello"),
+        "add": (lambda name, phone, birthday=None: add_contact(name, phonebook, phone=phone, birthday=birthday),
+                (2, 3), "add <name> <phone> [DD.MM.YYYY]"),
+        "change": (lambda name, phone: change_contact(name, phone, phonebook), (2,), "change <name> <phone>"),
+        "delete": (lambda name: delete_contact(name, phonebook), (1,), "delete <name>"),
+        "search": (lambda pattern: search_contact(pattern, phonebook), (1,), "search <pattern>"),
+        "show": (lambda: show_phonebook(phonebook), (0,), "show"),
+        "all": (lambda: show_phonebook(phonebook), (0,), "all"),
+        "close": (lambda: print("Good bye!"), (0,), "close"),
+        "exit": (lambda: print("Good bye!"), (0,), "exit"),
+        "phone": (lambda pattern: search_contact(pattern, phonebook), (1,), "phone <pattern>"),
+        "add-birthday": (lambda name, birthday: add_birthday(name, birthday, phonebook), (2,),
+                         "add-birthday <name> <DD.MM.YYYY>"),
+        "show-birthday": (lambda name: show_birthday(name, phonebook), (1,), "show-birthday <name>"),
+        "birthdays": (lambda: birthdays(phonebook), (0,), "birthdays"),
         }
 
     while True:
-        command = input("command: ").strip().split()
-        cmd = command[0].lower()
+        command = _split_command(input("command: "))
+        if not command:
+            continue
+        cmd = sys.intern(command[0].lower())
         args = command[1:]
 
-        if cmd in ["close", "exit"]:
-            commands[cmd](args)
-            break
-        elif cmd in commands:
-            try:
-                commands[cmd](args)
-            except Exception as e:
-                print("[ERROR]", e)
-        else:
+        handler, arity, usage = commands.get(cmd, (None, None, None))
+        if handler is None:
             print("Invalid command.")
             print("Available commands: hello, add, change, delete, search, show, phone, add-birthday, show-birthday, "
                   "birthdays, close, exit")
+            continue
+        if cmd in _EXITS:  # exit even if something follows the command
+            handler()
+            break
+        if len(args) not in arity:
+            print(f"Invalid arguments. Usage: {usage}")
+            continue
+        try:
+            message = handler(*args)  # handlers decorated with input_error return the error message
+        except Exception as e:
+            print("[ERROR]", e)
+        else:
+            if message:
+                print(message)
         # finally:
         #     save_phonebook(phonebook)
 
 
 if __name__ == '__main__':
-    # phonebook = load_phonebook()
-    main()
-    # save_phonebook(phonebook)
+    phonebook = load_phonebook()
+    main(phonebook)
+    save_phonebook(phonebook)
@@ -1,9 +1,19 @@
-from collections import UserDict
+import re
+import sys
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, UserDict
 from datetime import date, timedelta
+from functools import lru_cache
 from typing import List
 from normalize_phone import normalize_phone
 
 
+@lru_cache(maxsize=1024)  # the same names and patterns are typed again and again during a session
+def _casefold(value):
+    """Return the casefolded value, interned so equal keys are the same object."""
+    return sys.intern(value.casefold())
+
+
 class Field:
     """Base class for representing fields with a name and value.
 
@@ -27,11 +37,11 @@ class Name(Field):
     Inherits from Field.
 
     Attributes:
-        name (str): The name oj contact.
+        name (str): The name oj contact. Interned, so records with equal names share one string.
     """
 
     def __init__(self, name):
-        super().__init__('Name', name)
+        super().__init__('Name', sys.intern(name))
 
 
 class Phone(Field):
@@ -92,9 +102,10 @@ class Record:
             ValueError: If the phone number already exists in the contact.
             ValueError (from normalize_phone): If the phone number is not valid.
         """
-        if phone in [p.value for p in self.phones]:
+        normalized = normalize_phone(phone)
+        if any(p.value == normalized for p in self.phones):
             raise ValueError(f"Phone {phone} already exists")
-        self.phones.append(Phone(phone))
+        self.phones.append(Phone(normalized))
 
     def edit_phone(self, phone, new_phone):
         """Edit an existing phone number in the contact.
@@ -106,8 +117,9 @@ class Record:
         Returns:
             str: A message indicating the phone number was edited.
         """
+        normalized = normalize_phone(phone)
         for p in self.phones:
-            if p.value == normalize_phone(phone):
+            if p.value == normalized:
                 p.value = normalize_phone(new_phone)
                 return f"Phone {phone} edited to {new_phone}"
 
@@ -120,8 +132,9 @@ class Record:
         Returns:
             Phone: The phone object if found, None otherwise.
         """
+        normalized = normalize_phone(phone)
         for p in self.phones:
-            if p.value == normalize_phone(phone):
+            if p.value == normalized:
                 return p
         return None
 
@@ -134,8 +147,9 @@ class Record:
         Returns:
             str: A message indicating the phone number was deleted.
         """
+        normalized = normalize_phone(phone)
         for p in self.phones:
-            if p.value == normalize_phone(phone):
+            if p.value == normalized:
                 self.phones.remove(p)
                 return f"Phone {phone} deleted"
 
@@ -145,6 +159,14 @@ class Record:
         except ValueError as e:
             print(e)
 
+    def to_dict(self):
+        """Return a JSON-serializable representation of the contact record."""
+        return {
+            "name": self.name.value,
+            "phones": [p.value for p in self.phones],
+            "birthday": self.birthday.value.strftime('%d.%m.%Y') if self.birthday else None,
+        }
+
     def __str__(self):
         """Return a string representation of the contact record."""
         return (f"Contact name: {self.name.value}, "
@@ -156,14 +178,164 @@ class AddressBook(UserDict):
 
     Inherits from UserDict.
 
+    Records are keyed by the casefolded contact name, so lookups by name are case-insensitive,
+    including the dict interface (book["Bob"], "Bob" in book, get, pop, del).
+
+    The suffixes of the phone digits are kept in a sorted list, so a search by a part of the
+    phone number is a bisect over the suffixes starting with it instead of a scan over all
+    phones. The list is built on the first phone search and then kept up to date on every
+    change. For the search by
+    a part of the name all names are joined into one string, which is scanned with a single
+    str.find call per match. The names are also kept sorted, so listing the contacts by
+    name needs no sort.
+
     Methods:
         add_record: Add a contact record to the address book.
+        reindex: Refresh the phone index after the phones of a record were changed.
         find: Find a contact record by name. (in future may be by phone number)
+        search: Find contact records whose name or phone contains a pattern.
+        sorted_records: Iterate over the contact records sorted by name.
         delete_record: Delete a contact record by name.
     """
 
+    PHONE_PATTERN = re.compile(r'\+?\d+')
+    SEARCH_CACHE_SIZE = 256
+
+    def __init__(self, *args, **kwargs):
+        self._phone_suffixes = None  # sorted (digits suffix, record key) pairs, None until the first phone search
+        self._phone_digits = {}  # record key -> digits of its phones as they are in the index
+        self.journal = None  # path of the journal file, set when loaded from a file
+        self._names_blob = None  # '\0'-joined record keys, None when it has to be rebuilt
+        self._name_offsets = []  # start offset of every key in the blob
+        self._name_records = []  # records in the order of the blob
+        self._name_positions = {}  # record key -> position in the blob
+        self._sorted_names = []  # (name, record key) pairs sorted by name
+        self._search_cache = OrderedDict()  # pattern -> search result in LRU order, cleared on every change
+        super().__init__(*args, **kwargs)
+
+    # the dict interface is case-insensitive like find and delete_record
+    def __getitem__(self, key):
+        record = self.data.get(_casefold(key)) if isinstance(key, str) else None
+        if record is None:
+            raise KeyError(key)
+        return record
+
+    def __contains__(self, key):
+        return isinstance(key, str) and _casefold(key) in self.data
+
+    def __setitem__(self, key, record):
+        # goes through add_record, so the key is always the casefolded name of the record
+        self.add_record(record)
+
+    def __delitem__(self, key):
+        if not isinstance(key, str) or self.delete_record(key) is None:
+            raise KeyError(key)
+
+    def copy(self):
+        """Return a shallow copy with its own indexes. The copy is not journaled."""
+        phonebook = AddressBook()
+        for record in self.data.values():
+            phonebook.add_record(record)
+        return phonebook
+
+    __copy__ = copy
+
+    def _unsort_name(self, key, record):
+        i = bisect_left(self._sorted_names, (record.name.value, key))
+        del self._sorted_names[i]
+
+    def _build_phone_suffixes(self):
+        suffixes = []
+        for key, record in self.data.items():
+            self._phone_digits[key] = [phone.value.lstrip('+') for phone in record.phones]
+            for digits in self._phone_digits[key]:
+                suffixes.extend((digits[i:], key) for i in range(len(digits)))
+        suffixes.sort()
+        self._phone_suffixes = suffixes
+
+    def _index_phones(self, key, record):
+        if self._phone_suffixes is None:  # not built yet, nothing to keep up to date
+            return
+        self._phone_digits[key] = [phone.value.lstrip('+') for phone in record.phones]
+        for digits in self._phone_digits[key]:
+            for i in range(len(digits)):
+                insort(self._phone_suffixes, (digits[i:], key))
+
+    def _unindex_phones(self, key):
+        if self._phone_suffixes is None:
+            return
+        for digits in self._phone_digits.pop(key, ()):
+            for i in range(len(digits)):
+                del self._phone_suffixes[bisect_left(self._phone_suffixes, (digits[i:], key))]
+
     def add_record(self, record: Record):
-        self.data[record.name.value] = record
+        key = _casefold(record.name.value)
+        self._search_cache.clear()
+        old_record = self.data.get(key)
+        if old_record is not None:
+            self._unsort_name(key, old_record)
+            self._unindex_phones(key)
+        self._names_blob = None
+        self.data[key] = record
+        insort(self._sorted_names, (record.name.value, key))
+        self._index_phones(key, record)
+
+    def reindex(self, record: Record):
+        """Refresh the phone index of a record whose phones were added or edited in place.
+
+        Args:
+            record (Record): The contact record stored in the address book.
+        """
+        key = _casefold(record.name.value)
+        self._search_cache.clear()
+        self._unindex_phones(key)
+        self._index_phones(key, record)
+
+    def _build_names_blob(self):
+        keys = list(self.data)
+        self._name_records = list(self.data.values())
+        self._name_positions = {key: i for i, key in enumerate(keys)}
+        self._name_offsets = []
+        offset = 0
+        for key in keys:
+            self._name_offsets.append(offset)
+            offset += len(key) + 1
+        self._names_blob = '\0'.join(keys)
+
+    def _search_names(self, pattern_cf):
+        """Return the positions of the records whose name contains the casefolded pattern."""
+        if '\0' in pattern_cf:
+            return []
+        positions = []
+        pos = self._names_blob.find(pattern_cf)
+        while pos != -1:
+            i = bisect_right(self._name_offsets, pos) - 1
+            positions.append(i)
+            if i + 1 == len(self._name_offsets):
+                break
+            pos = self._names_blob.find(pattern_cf, self._name_offsets[i + 1])
+        return positions
+
+    def _search_phones(self, pattern):
+        """Return the keys of the records with a phone containing the pattern."""
+        if self.PHONE_PATTERN.fullmatch(pattern):
+            if self._phone_suffixes is None:
+                self._build_phone_suffixes()
+            # a phone contains the digits if one of its suffixes starts with them
+            digits = pattern.lstrip('+')
+            candidates = set()
+            i = bisect_left(self._phone_suffixes, (digits,))
+            while i < len(self._phone_suffixes) and self._phone_suffixes[i][0].startswith(digits):
+                candidates.add(self._phone_suffixes[i][1])
+                i += 1
+            # candidates still have to be checked, e.g. '+38' matches only at the start
+            return {
+                key for key in candidates
+                if any(pattern in phone.value for phone in self.data[key].phones)
+            }
+        if pattern == '+':
+            return {key for key, record in self.data.items() if record.phones}
+        return set()  # stored phones consist of '+' and digits only
 
     def find(self, name):
         """Find a contact record by name.
@@ -174,16 +346,67 @@ class AddressBook(UserDict):
         Returns:
             Record: The contact record if found, None otherwise.
         """
-        return self.data.get(name)
+        return self.data.get(_casefold(name))
+
+    def search(self, pattern):
+        """Search for contact records by a part of the name or phone number.
+
+        The pattern is casefolded once and looked up in the joined casefolded names and in the
+        phone index. A pattern which is a complete phone number in any format is normalized
+        once and compared with the stored normalized phones. Results are cached per pattern
+        until the address book changes, so repeating a search does not scan again.
+
+        Args:
+            pattern (str): The search pattern.
+
+        Returns:
+            List[Record]: The matching contact records.
+        """
+        if pattern in self._search_cache:
+            self._search_cache.move_to_end(pattern)
+            return list(self._search_cache[pattern])
+        query = pattern
+        pattern_cf = _casefold(pattern)
+        try:
+            pattern = normalize_phone(pattern)
+        except ValueError:
+            pass  # not a complete phone number, search by the pattern as is
+        if self._names_blob is None:
+            self._build_names_blob()
+        positions = {self._name_positions[key] for key in self._search_phones(pattern)}
+        positions.update(self._search_names(pattern_cf))
+        found = [self._name_records[i] for i in sorted(positions)]
+        self._search_cache[query] = found
+        if len(self._search_cache) > self.SEARCH_CACHE_SIZE:
+            self._search_cache.popitem(last=False)
+        return list(found)
+
+    def sorted_records(self):
+        """Iterate over the contact records sorted by name.
+
+        Returns:
+            Iterator[Record]: The contact records.
+        """
+        return (self.data[key] for _, key in self._sorted_names)
 
     def delete_record(self, name):
         """Delete a contact record by name.
 
         Args:
             name (str): The name of the contact to delete.
+
+        Returns:
+            Record: The deleted contact record if found, None otherwise.
         """
-        if name in self.data:
-            del self.data[name]
+        key = _casefold(name)
+        record = self.data.pop(key, None)
+        if record is None:
+            return None
+        self._search_cache.clear()
+        self._unindex_phones(key)
+        self._unsort_name(key, record)
+        self._names_blob = None
+        return record
 
     def get_upcoming_birthdays(self):
         today = date.today()
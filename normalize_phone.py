@@ -1,6 +1,8 @@
 import re
+from functools import lru_cache
 
 
+@lru_cache(maxsize=4096)
 def normalize_phone(phone_number: str) -> str:
     """Нормалізує телефонні номери до стандартного формату, залишаючи тільки цифри та символ '+' на початку (завжди повертає номер у форматі +380XXXXXXXXX)
 
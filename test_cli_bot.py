@@ -0,0 +1,204 @@
+import contextlib
+import copy
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+import cli_bot
+from cli_bot_classes import AddressBook, Record
+
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.filename = Path(tmp_dir.name) / "phonebook.json"
+        # the handlers report to the console
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+
+    def phones(self, phonebook, name):
+        return [phone.value for phone in phonebook.find(name).phones]
+
+    def test_changes_are_replayed_after_restart(self):
+        phonebook = cli_bot.load_phonebook(self.filename)
+        cli_bot.add_contact("Bob", phonebook, phone="0671111111")
+        cli_bot.add_contact("Ann", phonebook, phone="0672222222")
+        cli_bot.change_contact("bob", "0673333333", phonebook)
+        cli_bot.delete_contact("ann", phonebook)
+
+        phonebook = cli_bot.load_phonebook(self.filename)
+        self.assertEqual(self.phones(phonebook, "Bob"), ["+380673333333"])
+        self.assertIsNone(phonebook.find("Ann"))
+
+    def test_crash_between_snapshot_and_journal_removal(self):
+        phonebook = cli_bot.load_phonebook(self.filename)
+        cli_bot.add_contact("Bob", phonebook, phone="0671111111")
+        cli_bot.change_contact("bob", "0673333333", phonebook)
+        cli_bot.add_birthday("bob", "01.02.1990", phonebook)
+
+        # the snapshot is written, but the journal survives as if the process died before removing it
+        journal = phonebook.journal.read_bytes()
+        cli_bot.save_phonebook(phonebook, self.filename)
+        phonebook.journal.write_bytes(journal)
+
+        phonebook = cli_bot.load_phonebook(self.filename)
+        self.assertEqual(self.phones(phonebook, "Bob"), ["+380673333333"])
+        self.assertEqual(phonebook.find("Bob").birthday.value.isoformat(), "1990-02-01")
+
+    def test_rejected_birthday_is_not_journaled(self):
+        phonebook = cli_bot.load_phonebook(self.filename)
+        cli_bot.add_contact("Bob", phonebook, phone="0671111111", birthday="31.02.1990")
+        cli_bot.add_birthday("bob", "1990-02-01", phonebook)
+
+        self.assertEqual(len(phonebook.journal.read_bytes().splitlines()), 1)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            phonebook = cli_bot.load_phonebook(self.filename)
+        self.assertEqual(output.getvalue(), "")
+        self.assertIsNone(phonebook.find("Bob").birthday)
+
+    def test_unwritable_journal_turns_journaling_off(self):
+        phonebook = cli_bot.load_phonebook(self.filename)
+        phonebook.journal = self.filename.parent / "missing" / "phonebook.json.journal"
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            cli_bot.add_contact("Bob", phonebook, phone="0671111111")
+            cli_bot.change_contact("bob", "0673333333", phonebook)
+
+        lines = output.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("[WARNING] Changes are not journaled"))
+        self.assertEqual(lines[1:], ["Contact Bob added with phone number 0671111111",
+                                     "Contact bob updated.", "New phone: +380673333333"])
+        self.assertIsNone(phonebook.journal)
+
+    def test_torn_last_line_is_ignored(self):
+        phonebook = cli_bot.load_phonebook(self.filename)
+        cli_bot.add_contact("Bob", phonebook, phone="0671111111")
+        with open(phonebook.journal, "ab") as file:
+            file.write(b'{"op": "set", "name": "Ann", "pho')
+
+        phonebook = cli_bot.load_phonebook(self.filename)
+        self.assertEqual(list(phonebook), ["bob"])
+
+    def test_broken_line_before_the_last_is_an_error(self):
+        phonebook = cli_bot.load_phonebook(self.filename)
+        cli_bot.add_contact("Bob", phonebook, phone="0671111111")
+        valid = phonebook.journal.read_bytes()
+        for broken in (b'{"op": "set", "name": "Ann", "pho', b'[]', b'"x"', b'{"op": "rename"}'):
+            with self.subTest(broken=broken):
+                phonebook.journal.write_bytes(broken + b"\n" + valid)
+                with self.assertRaisesRegex(ValueError, "line 1"):
+                    cli_bot.load_phonebook(self.filename)
+
+    def test_non_object_last_line_is_ignored(self):
+        phonebook = cli_bot.load_phonebook(self.filename)
+        cli_bot.add_contact("Bob", phonebook, phone="0671111111")
+        with open(phonebook.journal, "ab") as file:
+            file.write(b'[]\n')
+
+        phonebook = cli_bot.load_phonebook(self.filename)
+        self.assertEqual(list(phonebook), ["bob"])
+
+
+class AddressBookTest(unittest.TestCase):
+    def test_dict_interface_keeps_indexes(self):
+        phonebook = AddressBook({"whatever": Record("Bob", ["0671111111"])})
+        phonebook["x"] = Record("ann", ["0672222222"])
+        self.assertEqual([record.name.value for record in phonebook.sorted_records()], ["Bob", "ann"])
+        self.assertEqual([record.name.value for record in phonebook.search("222")], ["ann"])
+
+        del phonebook["BOB"]
+        self.assertEqual([record.name.value for record in phonebook.sorted_records()], ["ann"])
+        self.assertEqual(phonebook.search("111"), [])
+        with self.assertRaises(KeyError):
+            del phonebook["Bob"]
+
+    def test_dict_interface_is_case_insensitive(self):
+        phonebook = AddressBook()
+        phonebook.add_record(Record("Bob", ["0671111111"]))
+        phonebook.add_record(Record("Ann", ["0672222222"]))
+        self.assertEqual(phonebook["BOB"].name.value, "Bob")
+        self.assertIn("bob", phonebook)
+        self.assertNotIn(1, phonebook)
+        self.assertEqual(phonebook.get("Bob").name.value, "Bob")
+        self.assertIsNone(phonebook.get("Zed"))
+        self.assertEqual(phonebook.pop("ANN").name.value, "Ann")
+        self.assertEqual([record.name.value for record in phonebook.sorted_records()], ["Bob"])
+        with self.assertRaises(KeyError):
+            phonebook["Ann"]
+
+    def test_copy_has_its_own_indexes(self):
+        phonebook = AddressBook({"x": Record("Ann", ["0672222222"])})
+        phonebook.journal = Path("phonebook.json.journal")
+        for copied in (phonebook.copy(), copy.copy(phonebook)):
+            copied.add_record(Record("Bob", ["0671111111"]))
+            self.assertEqual([record.name.value for record in copied.sorted_records()], ["Ann", "Bob"])
+            self.assertIsNone(copied.journal)
+        self.assertEqual([record.name.value for record in phonebook.sorted_records()], ["Ann"])
+        self.assertEqual(phonebook.search("111"), [])
+
+    def test_search_cache_is_bounded(self):
+        phonebook = AddressBook()
+        phonebook.add_record(Record("Bob", ["0671111111"]))
+        for i in range(AddressBook.SEARCH_CACHE_SIZE + 10):
+            phonebook.search(str(i))
+        self.assertEqual(len(phonebook._search_cache), AddressBook.SEARCH_CACHE_SIZE)
+
+
+class SearchTest(unittest.TestCase):
+    def setUp(self):
+        self.phonebook = AddressBook()
+        for name, phone in [("Ann", "0501112233"), ("Anna", "0672223344"),
+                            ("Joanne", "0931234567"), ("Bob", "0633805050")]:
+            self.phonebook.add_record(Record(name, [phone]))
+
+    def names(self, pattern):
+        return [record.name.value for record in self.phonebook.search(pattern)]
+
+    def test_name_substring_matches_several_records(self):
+        self.assertEqual(self.names("AN"), ["Ann", "Anna", "Joanne"])
+        self.assertEqual(self.names("ne"), ["Joanne"])
+        self.assertEqual(self.names("b"), ["Bob"])
+
+    def test_whole_name_matches_longer_names_too(self):
+        self.assertEqual(self.names("ann"), ["Ann", "Anna", "Joanne"])
+        self.assertEqual(self.names("joanne"), ["Joanne"])
+
+    def test_pattern_does_not_match_across_names(self):
+        self.assertEqual(self.names("nnan"), [])  # 'Ann' followed by 'Anna'
+        self.assertEqual(self.names("ann\0anna"), [])
+        self.assertEqual(self.names("zzz"), [])
+
+    def test_phone_digits(self):
+        self.assertEqual(self.names("1234"), ["Joanne"])
+        self.assertEqual(self.names("50"), ["Ann", "Bob"])
+        self.assertEqual(self.names("380"), ["Ann", "Anna", "Joanne", "Bob"])
+
+    def test_plus_matches_only_at_the_start(self):
+        self.assertEqual(self.names("+38067"), ["Anna"])
+        self.assertEqual(self.names("+3805"), ["Ann"])
+        self.assertEqual(self.names("+050"), [])
+
+    def test_full_number_in_any_format(self):
+        self.assertEqual(self.names("063-380-50-50"), ["Bob"])
+        self.assertEqual(self.names("+380931234567"), ["Joanne"])
+
+    def test_after_delete(self):
+        self.assertEqual(self.names("50"), ["Ann", "Bob"])  # builds the phone index
+        self.phonebook.delete_record("ann")
+        self.assertEqual(self.names("50"), ["Bob"])
+        self.assertEqual(self.names("an"), ["Anna", "Joanne"])
+
+    def test_after_change(self):
+        self.assertEqual(self.names("1234"), ["Joanne"])  # builds the phone index
+        record = self.phonebook.find("joanne")
+        record.edit_phone("0931234567", "0999999999")
+        self.phonebook.reindex(record)
+        self.assertEqual(self.names("1234"), [])
+        self.assertEqual(self.names("9999"), ["Joanne"])
+
+        self.phonebook.add_record(Record("Zed", ["0661234500"]))
+        self.assertEqual(self.names("1234"), ["Zed"])
+
+
+if __name__ == '__main__':
+    unittest.main()